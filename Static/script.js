@@ -32,6 +32,7 @@ document.addEventListener("DOMContentLoaded", () => {
   const headerSelectAll = document.getElementById("selectAllBtn");
   const exportBtn = document.getElementById("exportBtn");
   const adminCenterFilter = document.getElementById("adminCenterFilter");
+  const archivedToggle = document.getElementById("includeArchivedToggle");
   const bulkMsgEl = document.getElementById("bulkMsg");
 
   /* ===========================
@@ -40,9 +41,18 @@ document.addEventListener("DOMContentLoaded", () => {
   function qs(selector, root = document) { return root.querySelector(selector); }
   function qsa(selector, root = document) { return Array.from(root.querySelectorAll(selector)); }
 
+  // dashboard / export URL for a centre, keeping the include-archived opt-in
+  function viewUrl(path, center, includeArchived = !!archivedToggle?.checked) {
+    const p = new URLSearchParams();
+    if (center) p.set("center", center);
+    if (includeArchived) p.set("include_archived", "1");
+    const q = p.toString();
+    return q ? `${path}?${q}` : path;
+  }
+
   function setExportHrefForCenter(center) {
     if (!exportBtn) return;
-    exportBtn.href = center ? `/export?center=${encodeURIComponent(center)}` : `/export`;
+    exportBtn.href = viewUrl("/export", center);
   }
 
   function showToast(message, type = "info", timeout = 3000) {
@@ -783,7 +793,8 @@ document.addEventListener("DOMContentLoaded", () => {
       const json = await res.json().catch(() => ({}));
 
       if (json.ok) {
-        showBulkMsg(`${json.updated} updated.`, "success");
+        const skipped = json.skipped_archived ? ` ${json.skipped_archived} archived skipped.` : "";
+        showBulkMsg(`${json.updated} updated.${skipped}`, "success");
         setTimeout(() => location.reload(), 900);
       } else {
         showBulkMsg(json.error || "Failed", "error");
@@ -812,11 +823,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
       setExportHrefForCenter(selected);
 
-      const url = selected
-        ? `/dashboard?center=${encodeURIComponent(selected)}`
-        : `/dashboard`;
-
-      window.location.href = url;
+      window.location.href = viewUrl("/dashboard", selected);
     });
   }
 
@@ -824,6 +831,16 @@ document.addEventListener("DOMContentLoaded", () => {
   const pageCenter = params.get("center");
   if (pageCenter) setExportHrefForCenter(pageCenter);
 
+  /* ===========================
+      INCLUDE ARCHIVED TOGGLE
+  ============================ */
+  if (archivedToggle) {
+    archivedToggle.addEventListener("change", () => {
+      const center = adminCenterFilter ? adminCenterFilter.value : "";
+      window.location.href = viewUrl("/dashboard", center, archivedToggle.checked);
+    });
+  }
+
   /* ===========================
       INIT BUTTON ACTIONS
   ============================ */
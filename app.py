@@ -1,12 +1,24 @@
 # app.py — PostgreSQL-backed (JOIN Enrollment -> Adjustment) — updated
 from flask import (
     Flask, render_template, request, redirect, url_for, session,
-    send_from_directory, send_file, jsonify, abort
+    send_from_directory, send_file, abort, stream_with_context, g,
+    has_request_context
 )
-from datetime import datetime, date, time
-import os, io, uuid, json
+from datetime import datetime, date, time, timedelta
+import os, io, uuid, json, hashlib, operator, threading, random, tempfile, cProfile, pstats
+from collections import OrderedDict
+from time import monotonic, perf_counter
+from markupsafe import Markup
 import pandas as pd
+try:
+    import orjson
+except ImportError:  # optional: falls back to stdlib json
+    orjson = None
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import deferred
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from flask_sqlalchemy import SQLAlchemy
 
 # ---------- Config ----------
@@ -38,6 +50,32 @@ ADJUST_COLUMNS = [
     "Child Status", "Family Status", "Billing Cycle"
 ]
 
+# Approval is stored as one of these exact values (CHECK constraint), so queries never need lower()
+APPROVAL_PENDING = "Pending"
+APPROVAL_APPROVED = "Approved"
+APPROVAL_NOT_APPROVED = "Not Approved"
+APPROVAL_STATUSES = (APPROVAL_PENDING, APPROVAL_APPROVED, APPROVAL_NOT_APPROVED)
+# free-text spellings seen in older data / spreadsheets
+APPROVAL_ALIASES = {
+    "pending": APPROVAL_PENDING,
+    "approved": APPROVAL_APPROVED,
+    "not approved": APPROVAL_NOT_APPROVED,
+    "rejected": APPROVAL_NOT_APPROVED,
+    "no": APPROVAL_NOT_APPROVED,
+}
+# approval queue sort key: DateUpdated, with NULL treated as this stamp
+QUEUE_NULL_STAMP = datetime(1970, 1, 1)
+QUEUE_STAMP_SQL = "coalesce(\"DateUpdated\", timestamp '1970-01-01 00:00:00')"
+APPROVAL_CHECK_SQL = '"Approval" IN ({})'.format(", ".join(f"'{v}'" for v in APPROVAL_STATUSES))
+
+# Full-text search document for adjustments: names weigh most, then notes, then instructions
+SEARCH_CONFIG = "english"
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('{cfg}', coalesce(\"Child's Name\", '') || ' ' || coalesce(\"Family\", '')), 'A') || "
+    "setweight(to_tsvector('{cfg}', coalesce(\"Note/Description\", '')), 'B') || "
+    "setweight(to_tsvector('{cfg}', coalesce(\"Pulling Instructions\", '')), 'C')"
+).format(cfg=SEARCH_CONFIG)
+
 # ---------- Models ----------
 class User(db.Model):
     __tablename__ = "users"
@@ -65,12 +103,8 @@ class Enrollment(db.Model):
     )
 
 
-class Adjustment(db.Model):
-    __tablename__ = "adjustments"
-
-    # id as string (UUID)
-    id = db.Column(db.String(36), primary_key=True)
-
+class AdjustmentFields:
+    """Columns shared by the live adjustments table and its archive."""
     enrollment_id = db.Column(
         db.Integer,
         db.ForeignKey("enrollment.id"),
@@ -94,12 +128,119 @@ class Adjustment(db.Model):
     EndDate = db.Column("End Date", db.Date)
 
     AdjustmentRecurring = db.Column("Adjustment is Recurring?", db.String(20))
+    # plain string + CHECK (see approval_status in each table's __table_args__): a
+    # non-native Enum would raise LookupError on rows not yet normalized
     Approval = db.Column("Approval", db.String(50))
 
     ChildStatus = db.Column("Child Status", db.String(100))
     FamilyStatus = db.Column("Family Status", db.String(100))
     BillingCycle = db.Column("Billing Cycle", db.String(100))
 
+
+class Adjustment(AdjustmentFields, db.Model):
+    __tablename__ = "adjustments"
+
+    # id as string (UUID)
+    id = db.Column(db.String(36), primary_key=True)
+
+    # generated by PostgreSQL; deferred so normal row loads never fetch it
+    search_vector = deferred(db.Column(TSVECTOR, db.Computed(SEARCH_VECTOR_SQL, persisted=True)))
+
+    __table_args__ = (
+        db.Index("ix_adjustments_search_vector", "search_vector", postgresql_using="gin"),
+        db.Index("ix_adjustments_start_date", "Start Date"),
+        db.Index("ix_adjustments_date_updated", "DateUpdated"),
+        # the admin approval queue only ever reads pending rows, oldest first
+        # (rows with no DateUpdated sort first, see QUEUE_NULL_STAMP)
+        db.Index(
+            "ix_adjustments_pending_queue_stamp", db.text(QUEUE_STAMP_SQL), "id",
+            postgresql_where=db.text("\"Approval\" = 'Pending'")
+        ),
+        db.CheckConstraint(APPROVAL_CHECK_SQL, name="approval_status"),
+    )
+
+class ArchivedAdjustment(AdjustmentFields, db.Model):
+    """Adjustments from closed billing periods, moved out of the live table by archive_closed_periods()."""
+    __tablename__ = "adjustments_archive"
+
+    id = db.Column(db.String(36), primary_key=True)
+    ArchivedAt = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # same generated search document as the live table, so search can span both
+    search_vector = deferred(db.Column(TSVECTOR, db.Computed(SEARCH_VECTOR_SQL, persisted=True)))
+
+    __table_args__ = (
+        db.Index("ix_adjustments_archive_search_vector", "search_vector", postgresql_using="gin"),
+        db.Index("ix_adjustments_archive_start_date", "Start Date"),
+        db.Index("ix_adjustments_archive_date_updated", "DateUpdated"),
+        db.Index("ix_adjustments_archive_centre", "Centre"),
+        db.CheckConstraint(APPROVAL_CHECK_SQL, name="approval_status"),
+    )
+
+class AdjustmentRollup(db.Model):
+    """Pre-aggregated monthly totals for closed months (see refresh_report_rollup)."""
+    __tablename__ = "adjustment_monthly_rollup"
+
+    id = db.Column(db.Integer, primary_key=True)
+    DateField = db.Column(db.String(20), nullable=False)   # see REPORT_ROLLUP_FIELDS
+    Month = db.Column(db.Date, nullable=False)
+    Centre = db.Column(db.String(200))
+    PullingCategory = db.Column(db.String(100))
+    Approval = db.Column(db.String(50))
+    Count = db.Column(db.Integer, default=0)
+    Total = db.Column(db.Float, default=0.0)
+
+    __table_args__ = (
+        db.Index("ix_rollup_field_month", "DateField", "Month"),
+    )
+
+class AdjustmentHistory(db.Model):
+    """Append-only log of adjustment changes: one row per changed field (or per add)."""
+    __tablename__ = "adjustment_history"
+
+    id = db.Column(db.Integer, primary_key=True)
+    AdjustmentId = db.Column(db.String(36), nullable=False)
+    ChangedAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ChangedBy = db.Column(db.String(100))
+    Action = db.Column(db.String(20), nullable=False)   # add / edit / delete / approval / upload
+    Field = db.Column(db.String(100))
+    OldValue = db.Column(db.Text)
+    NewValue = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index("ix_history_adjustment", "AdjustmentId", "ChangedAt"),
+        db.Index("ix_history_user", "ChangedBy", "ChangedAt"),
+    )
+
+class DataVersion(db.Model):
+    """Counter bumped in the same transaction as every write to a dataset (cache stamp)."""
+    __tablename__ = "data_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    # new random value on every bump, so a restored / reset DB never repeats a stamp
+    token = db.Column(db.String(32))
+
+class RequestProfile(db.Model):
+    """A profiled request: timings, the SQL it ran and its cProfile summary."""
+    __tablename__ = "request_profiles"
+
+    id = db.Column(db.Integer, primary_key=True)
+    CreatedAt = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    Method = db.Column(db.String(10))
+    Path = db.Column(db.String(500))
+    User = db.Column(db.String(100))
+    Status = db.Column(db.Integer)
+    DurationMs = db.Column(db.Float)
+    SqlCount = db.Column(db.Integer)
+    SqlMs = db.Column(db.Float)
+    Statements = db.Column(db.Text)   # JSON list of {"sql", "ms"}
+    Profile = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index("ix_request_profiles_created", "CreatedAt"),
+    )
+
 # ---------- Utilities ----------
 USER_FILE = "data/users.json"
 ENROLL_FILE = "data/ChildEnrollment.csv"
@@ -140,6 +281,20 @@ def parse_date_safe(s):
                 continue
     return None
 
+def normalize_approval(v):
+    """Map an approval value onto APPROVAL_STATUSES; None if unrecognised."""
+    return APPROVAL_ALIASES.get(str(v or "").strip().lower())
+
+def legacy_approval(v):
+    """
+    Approval for imported / pre-constraint data: blank counts as Not Approved (as the
+    dashboard always counted it), anything unrecognised goes to Pending for review.
+    The schema upgrade applies the same rule in SQL.
+    """
+    if not str(v or "").strip():
+        return APPROVAL_NOT_APPROVED
+    return normalize_approval(v) or APPROVAL_PENDING
+
 def ensure_datetime_from_date_or_dt(v):
     """Input can be date or datetime or None. Return datetime or None."""
     if v is None:
@@ -170,51 +325,152 @@ def current_user():
 def require_login():
     return "user" in session
 
+def arg_flag(name):
+    """True for ?name=1 / true / yes."""
+    return (request.args.get(name) or "").strip().lower() in ("1", "true", "yes")
+
+# ---------- Serialization ----------
+# One mapping from Adjustment columns to front-end keys, in ADJUST_COLUMNS order.
+# Converters are chosen per column type up front so rows convert without type checks.
+def _text(v):
+    return v or ""
+
+def _amount(v):
+    return v if v is not None else ""
+
+def _iso_date(v):
+    return v.isoformat() if v else ""
+
+def _ymd(v):
+    return v.strftime("%Y-%m-%d") if v else ""
+
+ADJUST_FIELDS = [
+    ("ID", "id", _text),
+    ("Centre", "Centre", _text),
+    ("Date Updated", "DateUpdated", _ymd),
+    ("Family", "Family", _text),
+    ("Child's Name", "Childs_Name", _text),
+    ("Adjustment Amount", "AdjustmentAmount", _amount),
+    ("Note/Description", "NoteDescription", _text),
+    ("Pulling Category", "PullingCategory", _text),
+    ("Pulling Instructions", "PullingInstructions", _text),
+    ("Start Date", "StartDate", _iso_date),
+    ("End Date", "EndDate", _iso_date),
+    ("Adjustment is Recurring?", "AdjustmentRecurring", _text),
+    ("Approval", "Approval", _text),
+    ("Child Status", "ChildStatus", _text),
+    ("Family Status", "FamilyStatus", _text),
+    ("Billing Cycle", "BillingCycle", _text),
+]
+ADJUST_KEYS = [k for k, _, _ in ADJUST_FIELDS]
+ADJUST_CONVERTERS = [f for _, _, f in ADJUST_FIELDS]
+ADJUST_SELECT = [getattr(Adjustment, a) for _, a, _ in ADJUST_FIELDS]
+ARCHIVE_SELECT = [getattr(ArchivedAdjustment, a) for _, a, _ in ADJUST_FIELDS]
+_adjust_attrs = operator.attrgetter(*[a for _, a, _ in ADJUST_FIELDS])
+
+def adjustment_values(row):
+    """Converted values (ADJUST_COLUMNS order) for a row selected with ADJUST_SELECT."""
+    return [f(v) for f, v in zip(ADJUST_CONVERTERS, row)]
+
+def adjustment_row_dict(row):
+    return dict(zip(ADJUST_KEYS, adjustment_values(row)))
+
+def adjustment_to_dict(adj):
+    """Same mapping for an ORM Adjustment instance."""
+    return adjustment_row_dict(_adjust_attrs(adj))
+
+def json_dumps(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str).encode("utf-8")
+
+def json_response(obj, status=200):
+    return app.response_class(json_dumps(obj), status=status, mimetype="application/json")
+
+def stream_json_array(dicts):
+    """Stream an iterable of dicts as a JSON array without building the whole payload."""
+    def generate():
+        yield b"["
+        first = True
+        for d in dicts:
+            if not first:
+                yield b","
+            first = False
+            yield json_dumps(d)
+        yield b"]"
+    return app.response_class(stream_with_context(generate()), mimetype="application/json")
+
+# ---------- Change history ----------
+HISTORY_FIELDS = [k for k in ADJUST_KEYS if k not in ("ID", "Date Updated")]
+
+def _history_value(v):
+    return "" if v is None else str(v)
+
+def history_diff(adj_id, user, action, before=None, after=None, when=None):
+    """
+    History rows for one adjustment from two adjustment_to_dict() snapshots; a missing
+    side counts as blank, so deletes record every old value.
+    """
+    when = when or datetime.utcnow()
+    before, after = before or {}, after or {}
+    rows = []
+    for key in HISTORY_FIELDS:
+        old, new = _history_value(before.get(key)), _history_value(after.get(key))
+        if old != new:
+            rows.append({
+                "AdjustmentId": adj_id, "ChangedAt": when, "ChangedBy": user,
+                "Action": action, "Field": key, "OldValue": old, "NewValue": new
+            })
+    return rows
+
+def history_event(adj_ids, user, action, when=None):
+    """One row per adjustment for events without field diffs (add / upload)."""
+    when = when or datetime.utcnow()
+    return [
+        {"AdjustmentId": i, "ChangedAt": when, "ChangedBy": user, "Action": action}
+        for i in adj_ids
+    ]
+
+def record_history(rows):
+    """Queue history rows in the caller's transaction as one executemany insert."""
+    if rows:
+        db.session.execute(db.insert(AdjustmentHistory), rows)
+
+def history_to_dict(h):
+    return {
+        "adjustment_id": h.AdjustmentId,
+        "changed_at": h.ChangedAt.strftime("%Y-%m-%d %H:%M:%S") if h.ChangedAt else "",
+        "changed_by": h.ChangedBy or "",
+        "action": h.Action,
+        "field": h.Field or "",
+        "old": h.OldValue or "",
+        "new": h.NewValue or "",
+    }
+
 # ---------- DB -> DataFrame loader (JOIN enrollment -> adjustment) ----------
-def load_adjustments_df():
-    rows = Adjustment.query.all()
-    data = []
-    for r in rows:
-        # DateUpdated may be datetime; safe formatting
-        du = r.DateUpdated
-        if isinstance(du, datetime):
-            du_str = du.strftime("%Y-%m-%d")
-        elif isinstance(du, date):
-            du_str = du.isoformat()
-        else:
-            du_str = ""
-
-        data.append({
-            "ID": r.id,
-            "Centre": r.Centre or "",
-            "Family": r.Family or "",
-            "Child's Name": r.Childs_Name or "",
-            "Adjustment Amount": r.AdjustmentAmount if r.AdjustmentAmount is not None else "",
-            "Note/Description": r.NoteDescription or "",
-            "Pulling Category": r.PullingCategory or "",
-            "Pulling Instructions": r.PullingInstructions or "",
-            "Start Date": (r.StartDate.isoformat() if isinstance(r.StartDate, (date, datetime)) else (str(r.StartDate) if r.StartDate else "")),
-            "End Date": (r.EndDate.isoformat() if isinstance(r.EndDate, (date, datetime)) else (str(r.EndDate) if r.EndDate else "")),
-            "Adjustment is Recurring?": r.AdjustmentRecurring or "",
-            "Approval": r.Approval or "",
-            "Child Status": r.ChildStatus or "",
-            "Family Status": r.FamilyStatus or "",
-            "Billing Cycle": r.BillingCycle or "",
-            "Date Updated": du_str
-        })
-    # Ensure DataFrame always has the expected columns
-    df = pd.DataFrame(data)
-    for col in ADJUST_COLUMNS:
-        if col not in df.columns:
-            df[col] = ""
-    # Keep columns order stable
-    df = df[ADJUST_COLUMNS]
+def load_adjustments_df(include_archived=False):
+    """Live adjustments; with include_archived, archived rows too, flagged in an "Archived" column."""
+    rows = db.session.query(*ADJUST_SELECT).all()
+    live = len(rows)
+    if include_archived:
+        rows += db.session.query(*ARCHIVE_SELECT).all()
+    # columns are fixed by ADJUST_FIELDS, so an empty result still has them
+    df = pd.DataFrame([adjustment_values(r) for r in rows], columns=ADJUST_COLUMNS)
+    if include_archived:
+        df["Archived"] = [False] * live + [True] * (len(rows) - live)
     return df
 
+def missing_adjustment_response(id):
+    """404 for an unknown id; archived records (not editable) get an explicit 409."""
+    if db.session.query(ArchivedAdjustment.id).filter(ArchivedAdjustment.id == str(id)).first():
+        return json_response({"ok": False, "error": "Archived records are read-only"}, 409)
+    return abort(404)
+
 # ---------- CSV import (optional) ----------
 def import_csv_to_db_if_empty():
     """
-    If DB tables are empty and CSV files exist, import them.
+    If DB tables are empty and CSV files exist, import them (adjustments only when both
+    the live table and the archive are empty).
     For adjustments CSV we will:
       - ensure Enrollment rows exist for (Centre, ChildName)
       - create Adjustment rows pointing to the enrollment.id
@@ -243,8 +499,14 @@ def import_csv_to_db_if_empty():
             db.session.rollback()
             print("Enrollment import failed:", e)
 
-    # Adjust import: create enrollment if needed, set enrollment_id
-    if Adjustment.query.count() == 0 and os.path.exists(ADJUST_FILE):
+    # Adjust import: create enrollment if needed, set enrollment_id.
+    # Archiving can empty the live table, so only seed when the archive is empty too
+    # (the CSV carries fixed IDs that would collide with archived rows).
+    seeded = (
+        db.session.query(Adjustment.id).first() is not None
+        or db.session.query(ArchivedAdjustment.id).first() is not None
+    )
+    if not seeded and os.path.exists(ADJUST_FILE):
         try:
             df = pd.read_csv(ADJUST_FILE).fillna("").astype(str)
             for _, r in df.iterrows():
@@ -291,7 +553,7 @@ def import_csv_to_db_if_empty():
                     PullingCategory=str(r.get("Pulling Category","")).strip(),
                     PullingInstructions=str(r.get("Pulling Instructions","")).strip(),
                     AdjustmentRecurring=str(r.get("Adjustment is Recurring?","")).strip(),
-                    Approval=str(r.get("Approval","")).strip(),
+                    Approval=legacy_approval(r.get("Approval","")),
                     ChildStatus=str(r.get("Child Status","")).strip(),
                     FamilyStatus=str(r.get("Family Status","")).strip(),
                     BillingCycle=str(r.get("Billing Cycle","")).strip(),
@@ -300,28 +562,601 @@ def import_csv_to_db_if_empty():
                     Childs_Name=str(r.get("Child's Name","")).strip()
                 )
                 db.session.add(adj)
+            bump_data_version()
             db.session.commit()
             print("Imported adjustments CSV into DB.")
         except Exception as e:
             db.session.rollback()
             print("Adjustments import failed:", e)
 
-# ---------- Autofill helpers ----------
-def build_details_map():
-    rows = Enrollment.query.all()
-    m = {}
-    for r in rows:
-        centre_key = (r.Centre or "").strip().lower()
-        child_key = normalize_child_name(r.ChildName or "")
-        key = f"{centre_key}|||{child_key}"
-
-        m[key] = {
-            "Child Status": r.ChildStatus or "",
-            "Family Status": r.FamilyStatus or "",
-            "Billing Cycle": r.BillingCycle or ""
-        }
-    return m
+# ---------- Schema upgrades ----------
+# db.create_all() only creates missing tables; these idempotent statements bring
+# an existing database up to date with columns / indexes added since.
+SCHEMA_UPGRADES = [
+    f'ALTER TABLE adjustments ADD COLUMN IF NOT EXISTS search_vector tsvector '
+    f'GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED',
+    'CREATE INDEX IF NOT EXISTS ix_adjustments_search_vector ON adjustments USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS ix_adjustments_start_date ON adjustments ("Start Date")',
+    'CREATE INDEX IF NOT EXISTS ix_adjustments_date_updated ON adjustments ("DateUpdated")',
+    f'ALTER TABLE adjustments_archive ADD COLUMN IF NOT EXISTS search_vector tsvector '
+    f'GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED',
+    'CREATE INDEX IF NOT EXISTS ix_adjustments_archive_search_vector ON adjustments_archive USING gin (search_vector)',
+]
+
+# Approval values: fold legacy spellings onto APPROVAL_STATUSES with the legacy_approval()
+# rule (blank -> Not Approved, anything unrecognised -> Pending for review), then enforce
+# them with a CHECK constraint.
+for _table in ("adjustments", "adjustments_archive"):
+    SCHEMA_UPGRADES += [
+        f'UPDATE {_table} SET "Approval" = CASE '
+        + " ".join(f"WHEN lower(trim(\"Approval\")) = '{k}' THEN '{v}'" for k, v in APPROVAL_ALIASES.items())
+        + f" WHEN coalesce(trim(\"Approval\"), '') = '' THEN '{APPROVAL_NOT_APPROVED}'"
+        + f" ELSE '{APPROVAL_PENDING}' END"
+        + f' WHERE "Approval" IS NULL OR NOT ({APPROVAL_CHECK_SQL})',
+        f"DO $$ BEGIN "
+        f"IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'approval_status' "
+        f"AND conrelid = '{_table}'::regclass) THEN "
+        f'ALTER TABLE {_table} ADD CONSTRAINT approval_status CHECK ({APPROVAL_CHECK_SQL}); '
+        f"END IF; END $$",
+    ]
+SCHEMA_UPGRADES += [
+    'DROP INDEX IF EXISTS ix_adjustments_pending_queue',
+    f'CREATE INDEX IF NOT EXISTS ix_adjustments_pending_queue_stamp ON adjustments ({QUEUE_STAMP_SQL}, id) '
+    "WHERE \"Approval\" = 'Pending'",
+]
+SCHEMA_UPGRADES += [
+    "ALTER TABLE data_versions ADD COLUMN IF NOT EXISTS token varchar(32)",
+    "INSERT INTO data_versions (name, version, token) VALUES ('adjustments', 0, md5(random()::text)) "
+    "ON CONFLICT (name) DO NOTHING",
+]
+
+def apply_schema_upgrades():
+    try:
+        for stmt in SCHEMA_UPGRADES:
+            db.session.execute(db.text(stmt))
+        db.session.commit()
+        print("Schema upgrades applied.")
+    except Exception as e:
+        db.session.rollback()
+        print("Schema upgrade failed:", e)
+
+# ---------- Enrollment roster re-sync ----------
+# Fields compared between the roster CSV and the enrollment table
+# (model attribute -> CSV column)
+ENROLL_SYNC_FIELDS = {
+    "Family": "Family",
+    "ChildName": "Child's Name",
+    "ChildStatus": "Child Status",
+    "FamilyStatus": "Family Status",
+    "BillingCycle": "Billing Cycle",
+}
+ENROLL_STATUS_FIELDS = ("ChildStatus", "FamilyStatus")
+
+def enrollment_key(centre, child):
+    return f"{(centre or '').strip().lower()}|||{normalize_child_name(child or '')}"
+
+def enrollment_row_hash(values):
+    """Content hash of an enrollment row (dict keyed by model attribute)."""
+    raw = "\x1f".join((values.get(f) or "").strip() for f in ENROLL_SYNC_FIELDS)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def resync_enrollment_from_csv(source=ENROLL_FILE, dry_run=False, deactivate_missing=False):
+    """
+    Diff a roster CSV against the enrollment table and apply only the changes.
+    Rows are matched on (Centre, normalized child name) and compared by content hash,
+    so unchanged rows are never written. Returns a summary of the diff.
+      - inserted: roster rows with no matching enrollment
+      - updated: matched rows whose family / name / billing cycle changed
+      - status_changed: matched rows whose child or family status changed
+      - missing: enrollments not present in the roster (set Inactive if deactivate_missing)
+      - duplicate_keys / duplicate_rows_skipped: keys shared by several enrollments; only
+        the lowest id is synced, the other rows are counted here and left untouched
+      - roster_duplicates: roster rows overridden by a later row with the same key
+    """
+    df = pd.read_csv(source).fillna("").astype(str)
+
+    incoming = {}
+    roster_duplicates = 0
+    for r in df.to_dict("records"):
+        centre = str(r.get("Centre", "")).strip()
+        child = str(r.get("Child's Name", "")).strip()
+        if not centre and not child:
+            continue
+        values = {"Centre": centre}
+        for attr, col in ENROLL_SYNC_FIELDS.items():
+            values[attr] = str(r.get(col, "")).strip()
+        # later rows win for duplicate keys, same as a re-import would
+        key = enrollment_key(centre, child)
+        roster_duplicates += key in incoming
+        incoming[key] = values
+
+    existing = {}
+    duplicate_keys, duplicate_rows = set(), 0
+    cols = [Enrollment.id, Enrollment.Centre] + [getattr(Enrollment, a) for a in ENROLL_SYNC_FIELDS]
+    for row in db.session.query(*cols).order_by(Enrollment.id).all():
+        values = dict(row._mapping)
+        key = enrollment_key(values["Centre"], values["ChildName"])
+        if key in existing:
+            duplicate_keys.add(key)
+            duplicate_rows += 1
+            continue
+        existing[key] = values
+
+    inserts, updates = [], []
+    updated_keys, status_keys = [], []
+    unchanged = 0
+    for key, values in incoming.items():
+        cur = existing.get(key)
+        if cur is None:
+            inserts.append(values)
+            continue
+        if enrollment_row_hash(cur) == enrollment_row_hash(values):
+            unchanged += 1
+            continue
+        changed = {a: values[a] for a in ENROLL_SYNC_FIELDS if (cur.get(a) or "").strip() != values[a]}
+        updates.append(dict(changed, id=cur["id"]))
+        if any(a in changed for a in ENROLL_STATUS_FIELDS):
+            status_keys.append(key)
+        if any(a not in ENROLL_STATUS_FIELDS for a in changed):
+            updated_keys.append(key)
+
+    missing = [k for k in existing if k not in incoming]
+    if deactivate_missing:
+        for key in missing:
+            cur = existing[key]
+            if (cur.get("ChildStatus") or "") != "Inactive" or (cur.get("FamilyStatus") or "") != "Inactive":
+                updates.append({"id": cur["id"], "ChildStatus": "Inactive", "FamilyStatus": "Inactive"})
+                status_keys.append(key)
+
+    summary = {
+        "inserted": len(inserts),
+        "updated": len(updated_keys),
+        "status_changed": len(status_keys),
+        "unchanged": unchanged,
+        "missing": len(missing),
+        "duplicate_keys": len(duplicate_keys),
+        "duplicate_rows_skipped": duplicate_rows,
+        "roster_duplicates": roster_duplicates,
+        "dry_run": bool(dry_run),
+    }
+    if dry_run or (not inserts and not updates):
+        return summary
+
+    try:
+        if inserts:
+            db.session.bulk_insert_mappings(Enrollment, inserts)
+        if updates:
+            db.session.bulk_update_mappings(Enrollment, updates)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    roster_flight.forget()
+    return summary
+
+# ---------- Reporting (monthly aggregates) ----------
+# attribute names, resolved against the live table, the archive and the rollup
+REPORT_DATE_FIELDS = {"start": "StartDate", "updated": "DateUpdated"}
+REPORT_DIMENSIONS = {"centre": "Centre", "category": "PullingCategory", "approval": "Approval"}
+REPORT_SOURCES = (Adjustment, ArchivedAdjustment)
+# Only "start" is rolled up. Edits and approvals move DateUpdated to now, so an
+# "updated" rollup would count a row in both its old and new month; it stays live.
+REPORT_ROLLUP_FIELDS = ("start",)
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+def next_month(d):
+    return date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+
+def parse_month_arg(s):
+    """Accept YYYY-MM or any date parse_date_safe understands."""
+    s = (s or "").strip()
+    if len(s) == 7:
+        s += "-01"
+    return parse_date_safe(s)
+
+def refresh_report_rollup():
+    """
+    Rebuild the "start" monthly rollup for every closed month (anything before the current
+    month). The current month is always aggregated live. The rollup is a snapshot: approvals,
+    edits and deletes of rows in closed months are not reflected until it is rebuilt, so run
+    it after month-end approvals and back-dated corrections as well as once a month.
+    Archived adjustments are included.
+    """
+    cutoff = month_start(date.today())
+    names = ["DateField", "Month", "Centre", "PullingCategory", "Approval", "Count", "Total"]
+    try:
+        AdjustmentRollup.query.delete()
+        for field in REPORT_ROLLUP_FIELDS:
+            attr = REPORT_DATE_FIELDS[field]
+            for model in REPORT_SOURCES:
+                col = getattr(model, attr)
+                month = db.cast(db.func.date_trunc("month", col), db.Date)
+                sel = (
+                    db.select(
+                        db.literal(field), month,
+                        db.func.coalesce(model.Centre, ""),
+                        db.func.coalesce(model.PullingCategory, ""),
+                        db.func.coalesce(model.Approval, ""),
+                        db.func.count(model.id),
+                        db.func.coalesce(db.func.sum(model.AdjustmentAmount), 0.0),
+                    )
+                    .where(col.isnot(None), col < cutoff)
+                    .group_by(month, model.Centre, model.PullingCategory, model.Approval)
+                )
+                db.session.execute(db.insert(AdjustmentRollup).from_select(names, sel))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+def monthly_report(date_field="start", dimension="centre", centre=None, start=None, end=None):
+    """
+    Month-bucketed count / amount per dimension value. For date_field="start", closed
+    months come from the rollup table when it has been built; everything else is
+    aggregated live (live table and archive) over the date indexes.
+    Returns chart-ready {"months": [...], "series": [...]}.
+    """
+    roll_dim = getattr(AdjustmentRollup, REPORT_DIMENSIONS[dimension])
+
+    rolled_through = None
+    if date_field in REPORT_ROLLUP_FIELDS:
+        rolled_through = (
+            db.session.query(db.func.max(AdjustmentRollup.Month))
+            .filter(AdjustmentRollup.DateField == date_field).scalar()
+        )
+    live_from = next_month(rolled_through) if rolled_through else None
+
+    buckets = {}
+
+    def collect(rows):
+        for month, key, count, total in rows:
+            if month is None:
+                continue
+            b = buckets.setdefault((month_start(month), key or ""), [0, 0.0])
+            b[0] += int(count or 0)
+            b[1] += float(total or 0.0)
+
+    if rolled_through:
+        q = db.session.query(
+            AdjustmentRollup.Month, roll_dim,
+            db.func.sum(AdjustmentRollup.Count), db.func.sum(AdjustmentRollup.Total)
+        ).filter(AdjustmentRollup.DateField == date_field)
+        if centre:
+            q = q.filter(db.func.lower(AdjustmentRollup.Centre) == centre.lower())
+        if start:
+            q = q.filter(AdjustmentRollup.Month >= month_start(start))
+        if end:
+            q = q.filter(AdjustmentRollup.Month <= end)
+        collect(q.group_by(AdjustmentRollup.Month, roll_dim).all())
+
+    for model in REPORT_SOURCES:
+        live_col = getattr(model, REPORT_DATE_FIELDS[date_field])
+        live_dim = getattr(model, REPORT_DIMENSIONS[dimension])
+        month = db.cast(db.func.date_trunc("month", live_col), db.Date)
+        q = db.session.query(
+            month, live_dim,
+            db.func.count(model.id), db.func.sum(model.AdjustmentAmount)
+        ).filter(live_col.isnot(None))
+        if live_from:
+            q = q.filter(live_col >= live_from)
+        if centre:
+            q = q.filter(db.func.lower(model.Centre) == centre.lower())
+        if start:
+            q = q.filter(live_col >= month_start(start))
+        if end:
+            q = q.filter(live_col < next_month(end))
+        collect(q.group_by(month, live_dim).all())
+
+    months = sorted({m for m, _ in buckets})
+    index = {m: i for i, m in enumerate(months)}
+    series = {}
+    for (m, key), (count, total) in buckets.items():
+        s = series.setdefault(key, {"key": key, "count": [0] * len(months), "total": [0.0] * len(months)})
+        s["count"][index[m]] += count
+        s["total"][index[m]] = round(s["total"][index[m]] + total, 2)
+    return {
+        "months": [m.strftime("%Y-%m") for m in months],
+        "series": [series[k] for k in sorted(series)],
+    }
+
+# ---------- Archival of closed billing periods ----------
+# Billing periods that ended more than this many months ago are moved out of the live table
+ARCHIVE_AFTER_MONTHS = int(os.environ.get("ARCHIVE_AFTER_MONTHS", "6"))
+ARCHIVE_BATCH = 1000
+
+def archive_cutoff(months=ARCHIVE_AFTER_MONTHS):
+    today = date.today()
+    y, m = divmod(today.year * 12 + today.month - 1 - months, 12)
+    return date(y, m + 1, 1)
+
+def archive_closed_periods(cutoff=None, dry_run=False):
+    """
+    Move adjustments whose period (End Date, else Start Date) ended before `cutoff`
+    into adjustments_archive. Pending items stay live whatever their dates.
+    Returns the number of rows moved (or that would be moved on a dry run).
+    """
+    cutoff = cutoff or archive_cutoff()
+    closed = db.and_(
+        db.func.coalesce(Adjustment.EndDate, Adjustment.StartDate) < cutoff,
+        Adjustment.Approval.is_distinct_from(APPROVAL_PENDING),
+    )
+    if dry_run:
+        return db.session.query(db.func.count(Adjustment.id)).filter(closed).scalar()
+
+    attrs = ["id", "enrollment_id"] + [a for _, a, _ in ADJUST_FIELDS if a != "id"]
+    moved = 0
+    try:
+        # lock the rows so edits can't slip in between the copy and the delete
+        ids = [i for (i,) in db.session.query(Adjustment.id).filter(closed).with_for_update().all()]
+        now = datetime.utcnow()
+        for n in range(0, len(ids), ARCHIVE_BATCH):
+            batch = ids[n:n + ARCHIVE_BATCH]
+            sel = db.select(*[getattr(Adjustment, a) for a in attrs], db.literal(now)).where(Adjustment.id.in_(batch))
+            db.session.execute(
+                db.insert(ArchivedAdjustment).from_select(
+                    [getattr(ArchivedAdjustment, a) for a in attrs] + [ArchivedAdjustment.ArchivedAt], sel
+                )
+            )
+            db.session.query(Adjustment).filter(Adjustment.id.in_(batch)).delete(synchronize_session=False)
+            moved += len(batch)
+        if moved:
+            bump_data_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return moved
+
+# ---------- Request coalescing (single-flight) ----------
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one: the first caller runs the
+    loader, everyone else arriving meanwhile waits for and shares its result. Results
+    are kept for `ttl` seconds so bursts of identical lookups hit the DB once, and at
+    most `max_entries` are kept (oldest evicted first). Shared results must be treated
+    as read-only.
+    """
+    def __init__(self, ttl=30, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._results = OrderedDict()   # key -> (expires, value), oldest first
+
+    def do(self, key, loader):
+        now = monotonic()
+        with self._lock:
+            hit = self._results.get(key)
+            if hit and hit[0] > now:
+                return hit[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"event": threading.Event(), "value": None, "error": None}
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["value"]
+
+        try:
+            call["value"] = loader()
+            return call["value"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+                if call["error"] is None:
+                    self._results[key] = (monotonic() + self.ttl, call["value"])
+                    self._results.move_to_end(key)
+                    # one ttl for every entry, so the front is both oldest and first to expire
+                    now = monotonic()
+                    while self._results and (
+                        len(self._results) > self.max_entries or next(iter(self._results.values()))[0] <= now
+                    ):
+                        self._results.popitem(last=False)
+            call["event"].set()
+
+    def forget(self):
+        with self._lock:
+            self._results.clear()
+
+roster_flight = SingleFlight(ttl=30)
+
+def load_children_lists(centre):
+    """Children / families for one centre (or all when centre is None)."""
+    query = db.session.query(Enrollment.ChildName, Enrollment.Family)
+    if centre is not None:
+        query = query.filter(Enrollment.Centre == centre)
+    rows = query.all()
+    return {
+        "children": sorted({(c or "").strip() for c, _ in rows if c}),
+        "families": sorted({(f or "").strip() for _, f in rows if f}),
+    }
+
+def load_centre_names():
+    return sorted({(c or "").strip() for (c,) in db.session.query(Enrollment.Centre).distinct()})
+
+def load_centre_details(centre_key):
+    """normalized child name -> autofill details for one centre (first enrollment wins)."""
+    rows = (
+        db.session.query(Enrollment.ChildName, Enrollment.Family, Enrollment.ChildStatus,
+                         Enrollment.FamilyStatus, Enrollment.BillingCycle)
+        .filter(db.func.lower(db.func.trim(Enrollment.Centre)) == centre_key)
+        .order_by(Enrollment.id).all()
+    )
+    details = {}
+    for child, family, child_status, family_status, cycle in rows:
+        details.setdefault(normalize_child_name(child or ""), {
+            "Family": family or "",
+            "Child Status": child_status or "",
+            "Family Status": family_status or "",
+            "Billing Cycle": cycle or ""
+        })
+    return details
+
+# ---------- Dashboard fragment cache ----------
+# Rendered KPI cards and table rows, keyed by role, centre, the adjustments data stamp
+# and a salt for the code / templates that rendered them. The stamp lives in the DB so
+# every worker sees a bump the moment the write commits; the fragments live in a
+# per-process LRU backed by a private local-disk directory shared by the host's workers.
+FRAGMENT_CACHE_DIR = os.environ.get(
+    "FRAGMENT_CACHE_DIR", os.path.join(app.instance_path, "fragment_cache")
+)
+FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", "256"))
+FRAGMENT_TEMPLATES = ("_dashboard_kpis.html", "_dashboard_rows.html")
+ADJUSTMENTS_VERSION = "adjustments"
+
+def current_data_stamp(name=ADJUSTMENTS_VERSION):
+    """(version, token) for a dataset; None until its first bump (don't cache then)."""
+    row = db.session.query(DataVersion.version, DataVersion.token).filter(DataVersion.name == name).first()
+    return (row.version, row.token) if row and row.token else None
+
+def bump_data_version(name=ADJUSTMENTS_VERSION):
+    """Call inside the writing transaction, before commit, so the stamp moves with the data."""
+    token = uuid.uuid4().hex
+    updated = db.session.query(DataVersion).filter(DataVersion.name == name).update(
+        {DataVersion.version: DataVersion.version + 1, DataVersion.token: token}, synchronize_session=False
+    )
+    if not updated:
+        db.session.add(DataVersion(name=name, version=1, token=token))
+
+def fragment_cache_salt():
+    """Deploy revision plus the source of this module and the fragment templates."""
+    h = hashlib.sha1((os.environ.get("APP_VERSION") or os.environ.get("RENDER_GIT_COMMIT", "")).encode("utf-8"))
+    paths = [__file__] + [os.path.join(app.root_path, app.template_folder, n) for n in FRAGMENT_TEMPLATES]
+    for path in paths:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+FRAGMENT_CACHE_SALT = fragment_cache_salt()
+
+def private_cache_dir(path):
+    """
+    Create `path` readable by this user only. Fragments are rendered unescaped, so a
+    directory anyone else could write to is refused: returns "" (memory only) then.
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        if os.stat(path).st_uid != os.getuid():
+            raise OSError("owned by another user")
+        os.chmod(path, 0o700)
+    except OSError as e:
+        print("Fragment cache directory", path, "not usable, caching in memory only:", e)
+        return ""
+    return path
+
+class FragmentCache:
+    """
+    Bounded LRU of JSON-serializable values. Misses fall through to one file per key
+    under `directory` (written atomically), so a fragment rendered by one worker is
+    reused by the others. Set `directory` to "" to keep the cache in memory only.
+    """
+    def __init__(self, max_entries=256, directory=""):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._writes = 0
+        if directory:
+            self.directory = private_cache_dir(directory)
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + ".json")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, value)
+        return value
+
+    def set(self, key, value):
+        self._remember(key, value)
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            print("Fragment cache write failed:", e)
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % 32 == 0
+        if prune:
+            self._prune_disk()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _prune_disk(self):
+        """Drop the least recently written files beyond max_entries."""
+        try:
+            files = [os.path.join(self.directory, n) for n in os.listdir(self.directory) if n.endswith(".json")]
+            files.sort(key=os.path.getmtime, reverse=True)
+            for path in files[self.max_entries:]:
+                os.remove(path)
+        except OSError:
+            pass  # another worker pruned first
+
+dashboard_fragments = FragmentCache(FRAGMENT_CACHE_SIZE, FRAGMENT_CACHE_DIR)
+
+def render_dashboard_fragments(role, selected_center, include_archived):
+    """Query, filter and render the dashboard KPI cards and table rows."""
+    df = load_adjustments_df(include_archived=include_archived)
+
+    if "Centre" not in df.columns:
+        df["Centre"] = ""
+
+    df["Centre"] = df["Centre"].astype(str).str.strip()
+    all_centers = sorted(df["Centre"].dropna().unique().tolist())
+
+    if role != "admin" or selected_center:
+        df = df[df["Centre"].str.lower() == str(selected_center).strip().lower()]
+
+    records = df.fillna("").to_dict("records")
+
+    approval_counts = df["Approval"].value_counts()
+    try:
+        total_adjustment_amount = df["Adjustment Amount"].astype(str).replace("", "0").astype(float).sum()
+    except Exception:
+        total_adjustment_amount = 0.0
 
+    kpis = render_template(
+        "_dashboard_kpis.html",
+        total=len(records),
+        approved_count=int(approval_counts.get(APPROVAL_APPROVED, 0)),
+        pending_count=int(approval_counts.get(APPROVAL_PENDING, 0)),
+        not_approved_count=int(approval_counts.get(APPROVAL_NOT_APPROVED, 0)),
+        total_adjustment_amount=f"${total_adjustment_amount:,.2f}"
+    )
+    rows = render_template("_dashboard_rows.html", data=records, role=role)
+    return {"centers": all_centers, "kpis": kpis, "rows": rows}
+
+# ---------- Autofill helpers ----------
 def normalize_child_name(name: str) -> str:
     """
     Normalize child name so DB + API + JS use same format.
@@ -339,15 +1174,9 @@ def fill_auto_fields(payload):
     centre_key = (payload.get("Centre", "") or "").strip().lower()
     child_key = normalize_child_name(payload.get("Child's Name", "") or "")
 
-    key = f"{centre_key}|||{child_key}"
-
-    details = build_details_map().get(key, {
-        "Child Status": "",
-        "Family Status": "",
-        "Billing Cycle": ""
-    })
-
-    payload.update(details)
+    found = roster_flight.do(("details", centre_key), lambda: load_centre_details(centre_key)).get(child_key, {})
+    for k in ("Child Status", "Family Status", "Billing Cycle"):
+        payload[k] = found.get(k, "")
     return payload
 
 
@@ -419,54 +1248,222 @@ def api_children():
         return abort(401)
     _, role, user_center = current_user()
     q_center = (request.args.get("center") or request.args.get("centre") or "").strip()
-    query = Enrollment.query
     if role == "admin":
-        if q_center:
-            query = query.filter_by(Centre=q_center)
+        centre = q_center or None
     else:
-        query = query.filter_by(Centre=user_center)
-    rows = query.all()
-    children = sorted({(r.ChildName or "").strip() for r in rows if r.ChildName})
-    families = sorted({(r.Family or "").strip() for r in rows if r.Family})
-    centers = sorted({(r.Centre or "").strip() for r in Enrollment.query.distinct(Enrollment.Centre)})
-    return jsonify({"children": children, "families": families, "centers": centers})
+        centre = user_center
+    lists = roster_flight.do(("children", centre), lambda: load_children_lists(centre))
+    centers = roster_flight.do(("centres",), load_centre_names)
+    return json_response({"children": lists["children"], "families": lists["families"], "centers": centers})
 
 @app.route("/api/child_details")
 def api_child_details():
     centre = request.args.get("centre", "").strip()
     child  = request.args.get("child", "").strip()
 
-    # Normalize child name (apostrophes removed, extra spaces collapsed)
-    def normalize_child_name(name: str) -> str:
-        if not name:
-            return ""
-        cleaned = name.replace("'", " ")
-        cleaned = " ".join(cleaned.split())
-        return cleaned.strip().lower()
-
-    child_key = normalize_child_name(child)
-
-    # Match using normalized child name
-    rows = Enrollment.query.all()
-    for r in rows:
-        if (r.Centre or "").strip().lower() == centre.lower():
-            db_child = normalize_child_name(r.ChildName or "")
-            if db_child == child_key:
-                return jsonify({
-                    "Family": r.Family or "",
-                    "Child Status": r.ChildStatus or "",
-                    "Family Status": r.FamilyStatus or "",
-                    "Billing Cycle": r.BillingCycle or ""
-                })
+    # Match using normalized child name against the centre's (shared) roster map
+    centre_key = centre.lower()
+    details = roster_flight.do(("details", centre_key), lambda: load_centre_details(centre_key))
+    match = details.get(normalize_child_name(child))
+    if match:
+        return json_response(match)
 
     # No match
-    return jsonify({
+    return json_response({
         "Family": "",
         "Child Status": "",
         "Family Status": "",
         "Billing Cycle": ""
     })
 
+@app.route("/api/enrollment/resync", methods=["POST"])
+def api_enrollment_resync():
+    if not require_login():
+        return abort(401)
+    _, role, _ = current_user()
+    if role != "admin":
+        return abort(403)
+    # optional uploaded roster; defaults to the bundled CSV
+    upload = request.files.get("file")
+    source = upload.stream if upload and upload.filename else ENROLL_FILE
+    if source == ENROLL_FILE and not os.path.exists(ENROLL_FILE):
+        return json_response({"ok": False, "error": "No roster CSV provided"}, 400)
+    dry_run = arg_flag("dry_run")
+    deactivate = arg_flag("deactivate_missing")
+    try:
+        summary = resync_enrollment_from_csv(source, dry_run=dry_run, deactivate_missing=deactivate)
+    except Exception as e:
+        return json_response({"ok": False, "error": "Re-sync failed: " + str(e)}, 500)
+    return json_response({"ok": True, "diff": summary})
+
+@app.route("/api/search")
+def api_search():
+    if not require_login():
+        return abort(401)
+    _, role, user_center = current_user()
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return json_response({"ok": True, "results": []})
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 200))
+    except ValueError:
+        limit = 50
+
+    q_center = (request.args.get("center") or request.args.get("centre") or "").strip()
+    if role != "admin":
+        q_center = str(user_center).strip()
+
+    tsq = db.func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    # live table by default; ?include_archived=1 also searches closed periods
+    sources = [(Adjustment, ADJUST_SELECT)]
+    if arg_flag("include_archived"):
+        sources.append((ArchivedAdjustment, ARCHIVE_SELECT))
+    rows = []
+    for model, cols in sources:
+        rank = db.func.ts_rank(model.search_vector, tsq).label("rank")
+        query = db.session.query(*cols, rank).filter(model.search_vector.op("@@")(tsq))
+        if role != "admin" or q_center:
+            query = query.filter(db.func.lower(model.Centre) == q_center.lower())
+        rows += query.order_by(rank.desc(), model.DateUpdated.desc()).limit(limit).all()
+    if len(sources) > 1:
+        rows.sort(key=lambda r: (r.rank, r.DateUpdated or datetime.min), reverse=True)
+        rows = rows[:limit]
+    results = []
+    for row in rows:
+        d = adjustment_row_dict(row)
+        d["rank"] = round(float(row.rank), 4)
+        results.append(d)
+    return json_response({"ok": True, "results": results})
+
+@app.route("/api/reports/monthly")
+def api_reports_monthly():
+    if not require_login():
+        return abort(401)
+    _, role, user_center = current_user()
+    date_field = (request.args.get("date_field") or "start").strip().lower()
+    dimension = (request.args.get("group_by") or "centre").strip().lower()
+    if date_field not in REPORT_DATE_FIELDS:
+        return json_response({"ok": False, "error": "date_field must be one of: " + ", ".join(REPORT_DATE_FIELDS)}, 400)
+    if dimension not in REPORT_DIMENSIONS:
+        return json_response({"ok": False, "error": "group_by must be one of: " + ", ".join(REPORT_DIMENSIONS)}, 400)
+
+    start = parse_month_arg(request.args.get("from"))
+    end = parse_month_arg(request.args.get("to"))
+
+    centre = (request.args.get("center") or request.args.get("centre") or "").strip()
+    if role != "admin":
+        centre = str(user_center).strip()
+
+    try:
+        report = monthly_report(date_field, dimension, centre=centre or None, start=start, end=end)
+    except Exception as e:
+        return json_response({"ok": False, "error": "Report failed: " + str(e)}, 500)
+    return json_response({"ok": True, "date_field": date_field, "group_by": dimension, **report})
+
+@app.route("/api/adjustments")
+def api_adjustments():
+    if not require_login():
+        return abort(401)
+    _, role, user_center = current_user()
+    centre = (request.args.get("center") or request.args.get("centre") or "").strip()
+    if role != "admin":
+        centre = str(user_center).strip()
+
+    query = db.session.query(*ADJUST_SELECT)
+    if centre:
+        query = query.filter(db.func.lower(Adjustment.Centre) == centre.lower())
+    queries = [query.order_by(Adjustment.DateUpdated.desc())]
+    if arg_flag("include_archived"):
+        archived = db.session.query(*ARCHIVE_SELECT)
+        if centre:
+            archived = archived.filter(db.func.lower(ArchivedAdjustment.Centre) == centre.lower())
+        queries.append(archived.order_by(ArchivedAdjustment.DateUpdated.desc()))
+
+    # ?stream=1 writes a bare JSON array row by row for large centres
+    if arg_flag("stream"):
+        return stream_json_array(adjustment_row_dict(r) for q in queries for r in q.yield_per(500))
+    return json_response({"ok": True, "records": [adjustment_row_dict(r) for q in queries for r in q.all()]})
+
+# ---------- Approval queue ----------
+APPROVAL_QUEUE_PAGE = 50
+
+def parse_queue_cursor(cursor):
+    """'<queue stamp iso>|<id>' -> (datetime, id); None if blank, ValueError if malformed."""
+    if not cursor:
+        return None
+    stamp, _, adj_id = cursor.partition("|")
+    return datetime.fromisoformat(stamp), adj_id
+
+def pending_queue_page(centre=None, after=None, limit=APPROVAL_QUEUE_PAGE):
+    """
+    One oldest-first page of pending adjustments across centres. Keyset pagination on
+    (coalesced DateUpdated, id) keeps every page on the partial pending index, however
+    much approved history the table holds; rows with no DateUpdated come first.
+    Returns (rows as dicts, next cursor or None, total pending).
+    """
+    stamp = db.func.coalesce(Adjustment.DateUpdated, QUEUE_NULL_STAMP)
+    base = db.session.query(*ADJUST_SELECT).filter(Adjustment.Approval == APPROVAL_PENDING)
+    if centre:
+        # same case / whitespace-insensitive match as the dashboard's centre filter
+        base = base.filter(db.func.lower(db.func.trim(Adjustment.Centre)) == centre.strip().lower())
+    total = base.with_entities(db.func.count(Adjustment.id)).scalar()
+
+    query = base.add_columns(stamp.label("queue_stamp"))
+    if after:
+        query = query.filter(db.tuple_(stamp, Adjustment.id) > after)
+    rows = query.order_by(stamp, Adjustment.id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = f"{last.queue_stamp.isoformat()}|{last.id}"
+    return [adjustment_row_dict(r) for r in rows], next_cursor, total
+
+def approval_queue_args():
+    centre = (request.args.get("center") or request.args.get("centre") or "").strip()
+    try:
+        limit = max(1, min(int(request.args.get("limit", APPROVAL_QUEUE_PAGE)), 200))
+    except ValueError:
+        limit = APPROVAL_QUEUE_PAGE
+    return centre, parse_queue_cursor((request.args.get("after") or "").strip()), limit
+
+@app.route("/api/approvals")
+def api_approvals():
+    if not require_login():
+        return abort(401)
+    _, role, _ = current_user()
+    if role != "admin":
+        return abort(403)
+    try:
+        centre, after, limit = approval_queue_args()
+    except ValueError:
+        return json_response({"ok": False, "error": "Invalid cursor"}, 400)
+    rows, next_cursor, total = pending_queue_page(centre or None, after, limit)
+    return json_response({"ok": True, "pending": total, "records": rows, "next": next_cursor})
+
+@app.route("/approvals")
+def approvals():
+    if not require_login():
+        return redirect(url_for("login"))
+    user, role, center = current_user()
+    if role != "admin":
+        return abort(403)
+    try:
+        centre, after, limit = approval_queue_args()
+    except ValueError:
+        return redirect(url_for("approvals"))
+    rows, next_cursor, total = pending_queue_page(centre or None, after, limit)
+    return render_template(
+        "approvals.html",
+        data=rows,
+        pending_total=total,
+        next_cursor=next_cursor,
+        selected_center=centre,
+        centers=roster_flight.do(("centres",), load_centre_names),
+        username=user
+    )
+
 # ---------- Dashboard ----------
 @app.route("/dashboard")
 def dashboard():
@@ -475,50 +1472,31 @@ def dashboard():
 
     user, role, center = current_user()
 
-    df = load_adjustments_df()
-
-    if "Centre" not in df.columns:
-        df["Centre"] = ""
-
-    df["Centre"] = df["Centre"].astype(str).str.strip()
-    selected_center = (request.args.get("center") or "").strip()
-    all_centers = sorted(df["Centre"].dropna().unique().tolist())
-
+    # live window by default; ?include_archived=1 adds closed periods
+    include_archived = arg_flag("include_archived")
     if role == "admin":
-        if selected_center:
-            df = df[df["Centre"].str.lower() == selected_center.lower()]
+        selected_center = (request.args.get("center") or "").strip()
     else:
-        df = df[df["Centre"].str.lower() == str(center).strip().lower()]
         selected_center = center
 
-    records = df.fillna("").to_dict("records")
-
-    total = len(records)
-    approved_count = df[df["Approval"].astype(str).str.lower() == "approved"].shape[0]
-    pending_count = df[df["Approval"].astype(str).str.lower() == "pending"].shape[0]
-    not_approved_count = df[
-        (df["Approval"].astype(str).str.strip() == "") |
-        (df["Approval"].astype(str).str.lower().isin(["not approved", "rejected", "no"]))
-    ].shape[0]
-
-    try:
-        total_adjustment_amount = df["Adjustment Amount"].astype(str).replace("", "0").astype(float).sum()
-    except Exception:
-        total_adjustment_amount = 0.0
+    stamp = current_data_stamp()
+    key = (FRAGMENT_CACHE_SALT, role, str(selected_center).strip().lower(), include_archived, stamp)
+    fragments = dashboard_fragments.get(key) if stamp else None
+    if fragments is None:
+        fragments = render_dashboard_fragments(role, selected_center, include_archived)
+        if stamp:
+            dashboard_fragments.set(key, fragments)
 
     return render_template(
         "dashboard.html",
-        data=records,
-        total=total,
+        include_archived=include_archived,
         role=role,
         user_center=center,
         username=user,
-        centers=all_centers,
+        centers=fragments["centers"],
         selected_center=selected_center,
-        approved_count=approved_count,
-        pending_count=pending_count,
-        not_approved_count=not_approved_count,
-        total_adjustment_amount=f"${total_adjustment_amount:,.2f}"
+        kpis_html=Markup(fragments["kpis"]),
+        rows_html=Markup(fragments["rows"])
     )
 
 # ---------- Validation ----------
@@ -546,9 +1524,94 @@ def validate_payload(payload, role):
     except:
         pass
     if role != "admin":
-        payload["Approval"] = "Pending"
+        payload["Approval"] = APPROVAL_PENDING
+    elif str(payload.get("Approval","")).strip():
+        approval = normalize_approval(payload.get("Approval"))
+        if approval:
+            payload["Approval"] = approval
+        else:
+            missing.append("Approval (must be Pending, Approved or Not Approved)")
     return missing, payload
 
+# upload column -> Adjustment attribute
+UPLOAD_ATTRS = {
+    "Centre": "Centre", "Family": "Family", "Child's Name": "Childs_Name",
+    "Adjustment Amount": "AdjustmentAmount", "Note/Description": "NoteDescription",
+    "Pulling Category": "PullingCategory", "Pulling Instructions": "PullingInstructions",
+    "Start Date": "StartDate", "End Date": "EndDate",
+    "Adjustment is Recurring?": "AdjustmentRecurring", "Approval": "Approval",
+    "Child Status": "ChildStatus", "Family Status": "FamilyStatus", "Billing Cycle": "BillingCycle",
+}
+UPLOAD_FIELDS = list(UPLOAD_ATTRS)
+UPLOAD_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%d-%m-%Y", "%m/%d/%Y")
+
+def parse_date_column(s):
+    """Vectorized parse_date_safe: try each accepted format over the whole column."""
+    parsed = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    for fmt in UPLOAD_DATE_FORMATS:
+        todo = parsed.isna() & (s != "")
+        if not todo.any():
+            break
+        parsed[todo] = pd.to_datetime(s[todo], format=fmt, errors="coerce")
+    return parsed
+
+def validate_upload_frame(df, role, center):
+    """
+    Validate a whole uploaded sheet at once (same rules as validate_payload).
+    Returns (clean frame with parsed amount / dates, {row index: [errors]}).
+    """
+    df = df.rename(columns=lambda c: str(c).strip())
+    for col in UPLOAD_FIELDS:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[UPLOAD_FIELDS].fillna("").astype(str).apply(lambda s: s.str.strip())
+
+    if role != "admin":
+        df["Centre"] = center
+        df["Approval"] = APPROVAL_PENDING
+    df.loc[df["Pulling Category"] == "Pull", "Pulling Instructions"] = ""
+
+    # autofill statuses from enrollment: the same per-centre roster maps as the form
+    # (first enrollment wins), fetched once per distinct centre in the sheet
+    centre_keys = df["Centre"].str.lower()
+    keys = centre_keys + "|||" + df["Child's Name"].map(normalize_child_name)
+    roster = {}
+    for ck in centre_keys.unique():
+        centre_details = roster_flight.do(("details", ck), lambda ck=ck: load_centre_details(ck))
+        roster.update({f"{ck}|||{child}": d for child, d in centre_details.items()})
+    details = pd.DataFrame.from_dict(roster, orient="index")
+    if not details.empty:
+        for col in ("Child Status", "Family Status", "Billing Cycle"):
+            df[col] = keys.map(details[col]).fillna("")
+    else:
+        df[["Child Status", "Family Status", "Billing Cycle"]] = ""
+
+    amount = pd.to_numeric(
+        df["Adjustment Amount"].str.replace(r"[$,]", "", regex=True), errors="coerce"
+    )
+    approval = df["Approval"].str.lower().map(APPROVAL_ALIASES)
+    start = parse_date_column(df["Start Date"])
+    end = parse_date_column(df["End Date"])
+
+    checks = [(df[k] == "", k) for k in MANDATORY_FIELDS]
+    checks += [
+        (amount.isna() & (df["Adjustment Amount"] != ""), "Adjustment Amount (must be number)"),
+        (approval.isna() & (df["Approval"] != ""), "Approval (must be Pending, Approved or Not Approved)"),
+        (start.isna() & (df["Start Date"] != ""), "Start Date (invalid date)"),
+        (end.isna() & (df["End Date"] != ""), "End Date (invalid date)"),
+        (end < start, "End Date must be on or after Start Date"),
+    ]
+    errors = {}
+    for mask, msg in checks:
+        for idx in mask[mask].index:
+            errors.setdefault(idx, []).append(msg)
+
+    df["Adjustment Amount"] = amount
+    df["Approval"] = approval
+    df["Start Date"] = start.dt.date
+    df["End Date"] = end.dt.date
+    return df, errors
+
 # ---------- CRUD ----------
 @app.route("/records/add", methods=["POST"])
 def add_record():
@@ -571,7 +1634,7 @@ def add_record():
     payload = fill_auto_fields(payload)
     missing, payload = validate_payload(payload, role)
     if missing:
-        return jsonify({"ok": False, "error": "Missing/invalid: " + ", ".join(missing)}), 400
+        return json_response({"ok": False, "error": "Missing/invalid: " + ", ".join(missing)}, 400)
 
     try:
         amt = float(payload.get("Adjustment Amount") or 0.0)
@@ -582,6 +1645,7 @@ def add_record():
 
     # ensure or create enrollment
     enrol = None
+    new_enrol = False
     if payload.get("Centre","") and payload.get("Child's Name",""):
         enrol = Enrollment.query.filter_by(Centre=payload["Centre"], ChildName=payload["Child's Name"]).first()
         if not enrol:
@@ -595,6 +1659,7 @@ def add_record():
             )
             db.session.add(enrol)
             db.session.flush()  # ensure enrol.id available
+            new_enrol = True
 
     # convert Date Updated to datetime
     du_date = parse_date_safe(payload.get("Date Updated",""))
@@ -622,38 +1687,25 @@ def add_record():
 
     try:
         db.session.add(adj)
+        record_history(history_event([new_id], user, "add"))
+        bump_data_version()
         db.session.commit()
+        if new_enrol:
+            roster_flight.forget()
 
         # Build a record dict to return to frontend so JS can render immediately
-        record = {
-            "ID": new_id,
-            "id": new_id,
-            "Centre": adj.Centre or "",
-            "Family": adj.Family or "",
-            "Child's Name": adj.Childs_Name or "",
-            "Adjustment Amount": adj.AdjustmentAmount if adj.AdjustmentAmount is not None else "",
-            "Note/Description": adj.NoteDescription or "",
-            "Pulling Category": adj.PullingCategory or "",
-            "Pulling Instructions": adj.PullingInstructions or "",
-            "Start Date": (adj.StartDate.isoformat() if adj.StartDate else ""),
-            "End Date": (adj.EndDate.isoformat() if adj.EndDate else ""),
-            "Adjustment is Recurring?": adj.AdjustmentRecurring or "",
-            "Approval": adj.Approval or "",
-            "Child Status": adj.ChildStatus or "",
-            "Family Status": adj.FamilyStatus or "",
-            "Billing Cycle": adj.BillingCycle or "",
-            "Date Updated": adj.DateUpdated.strftime("%Y-%m-%d") if adj.DateUpdated else ""
-        }
+        record = adjustment_to_dict(adj)
+        record["id"] = new_id
 
         # return full record so frontend can use returned values immediately
-        return jsonify({"ok": True, "record": record})
+        return json_response({"ok": True, "record": record})
 
     except IntegrityError as e:
         db.session.rollback()
-        return jsonify({"ok": False, "error": "Integrity error: " + str(e)}), 500
+        return json_response({"ok": False, "error": "Integrity error: " + str(e)}, 500)
     except Exception as e:
         db.session.rollback()
-        return jsonify({"ok": False, "error": "DB error: " + str(e)}), 500
+        return json_response({"ok": False, "error": "DB error: " + str(e)}, 500)
 
 @app.route("/records/edit/<id>", methods=["POST"])
 def edit_record(id):
@@ -662,12 +1714,13 @@ def edit_record(id):
     user, role, center = current_user()
     adj = Adjustment.query.filter_by(id=str(id)).first()
     if not adj:
-        return abort(404)
+        return missing_adjustment_response(id)
     if role != "admin":
         # find associated enrollment centre or block
         enr = adj.enrollment
         if not enr or (enr.Centre or "").strip().lower() != str(center).strip().lower():
             return abort(403)
+    before = adjustment_to_dict(adj)
 
     keys = [
         "Centre","Family","Child's Name","Adjustment Amount","Note/Description",
@@ -685,11 +1738,12 @@ def edit_record(id):
     payload = fill_auto_fields(payload)
     missing, payload = validate_payload(payload, role)
     if missing:
-        return jsonify({"ok": False, "error": "Missing/invalid: " + ", ".join(missing)}), 400
+        return json_response({"ok": False, "error": "Missing/invalid: " + ", ".join(missing)}, 400)
 
     try:
         # ensure or update enrollment
         enrol = None
+        new_enrol = False
         if payload.get("Centre","") and payload.get("Child's Name",""):
             enrol = Enrollment.query.filter_by(Centre=payload["Centre"], ChildName=payload["Child's Name"]).first()
             if not enrol:
@@ -703,6 +1757,7 @@ def edit_record(id):
                 )
                 db.session.add(enrol)
                 db.session.flush()
+                new_enrol = True
 
         adj.enrollment_id = enrol.id if enrol else adj.enrollment_id
         # update Centre/Family/Childs_Name on the adjustment as well
@@ -725,12 +1780,16 @@ def edit_record(id):
         adj.ChildStatus = payload.get("Child Status","")
         adj.FamilyStatus = payload.get("Family Status","")
         adj.BillingCycle = payload.get("Billing Cycle","")
+        record_history(history_diff(adj.id, user, "edit", before, adjustment_to_dict(adj)))
+        bump_data_version()
         db.session.commit()
+        if new_enrol:
+            roster_flight.forget()
 
-        return jsonify({"ok": True})
+        return json_response({"ok": True})
     except Exception as e:
         db.session.rollback()
-        return jsonify({"ok": False, "error": "DB error: " + str(e)}), 500
+        return json_response({"ok": False, "error": "DB error: " + str(e)}, 500)
 
 @app.route("/records/delete/<id>", methods=["POST"])
 def delete_record(id):
@@ -739,19 +1798,89 @@ def delete_record(id):
     user, role, center = current_user()
     adj = Adjustment.query.filter_by(id=str(id)).first()
     if not adj:
-        return abort(404)
+        return missing_adjustment_response(id)
     # if non-admin, ensure user's centre matches the enrollment centre
     if role != "admin":
         enr = adj.enrollment
         if not enr or (enr.Centre or "").strip().lower() != str(center).strip().lower():
             return abort(403)
     try:
+        record_history(history_diff(adj.id, user, "delete", before=adjustment_to_dict(adj)))
         db.session.delete(adj)
+        bump_data_version()
+        db.session.commit()
+        return json_response({"ok": True})
+    except Exception as e:
+        db.session.rollback()
+        return json_response({"ok": False, "error": "DB error: " + str(e)}, 500)
+
+# ---------- Spreadsheet upload ----------
+@app.route("/records/upload", methods=["POST"])
+def upload_records():
+    if not require_login():
+        return abort(401)
+    user, role, center = current_user()
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return json_response({"ok": False, "error": "No file uploaded"}, 400)
+    name = upload.filename.lower()
+    try:
+        if name.endswith((".xlsx", ".xls")):
+            raw = pd.read_excel(upload.stream, dtype=str)
+        elif name.endswith(".csv"):
+            raw = pd.read_csv(upload.stream, dtype=str)
+        else:
+            return json_response({"ok": False, "error": "Upload a .csv or .xlsx file"}, 400)
+    except Exception as e:
+        return json_response({"ok": False, "error": "Could not read file: " + str(e)}, 400)
+
+    df, errors = validate_upload_frame(raw, role, center)
+    # report spreadsheet row numbers (header is row 1)
+    report = [{"row": int(i) + 2, "errors": errors[i]} for i in sorted(errors)]
+    valid = df.drop(index=list(errors))
+    dry_run = arg_flag("dry_run")
+    if dry_run or valid.empty:
+        return json_response({"ok": not report, "total": len(df), "inserted": 0, "errors": report})
+
+    try:
+        records = valid.rename(columns=UPLOAD_ATTRS).to_dict("records")
+
+        # resolve enrollments for every (Centre, Child) in one query; create the missing ones
+        enrol_ids = {
+            (c, n): i for i, c, n in db.session.query(Enrollment.id, Enrollment.Centre, Enrollment.ChildName)
+            .filter(Enrollment.Centre.in_(set(valid["Centre"]))).all()
+        }
+        new_enrols = {}
+        for rec in records:
+            key = (rec["Centre"], rec["Childs_Name"])
+            if key not in enrol_ids and key not in new_enrols:
+                new_enrols[key] = Enrollment(
+                    Centre=rec["Centre"], Family=rec["Family"], ChildName=rec["Childs_Name"],
+                    ChildStatus=rec["ChildStatus"], FamilyStatus=rec["FamilyStatus"],
+                    BillingCycle=rec["BillingCycle"]
+                )
+        if new_enrols:
+            db.session.add_all(new_enrols.values())
+            db.session.flush()
+            enrol_ids.update({k: e.id for k, e in new_enrols.items()})
+
+        now = datetime.utcnow()
+        rows = [
+            dict(rec, id=str(uuid.uuid4()), DateUpdated=now,
+                 enrollment_id=enrol_ids.get((rec["Centre"], rec["Childs_Name"])))
+            for rec in records
+        ]
+        db.session.bulk_insert_mappings(Adjustment, rows)
+        record_history(history_event([r["id"] for r in rows], user, "upload", when=now))
+        bump_data_version()
         db.session.commit()
-        return jsonify({"ok": True})
+        if new_enrols:
+            roster_flight.forget()
     except Exception as e:
         db.session.rollback()
-        return jsonify({"ok": False, "error": "DB error: " + str(e)}), 500
+        return json_response({"ok": False, "error": "DB error: " + str(e), "errors": report}, 500)
+
+    return json_response({"ok": not report, "total": len(df), "inserted": len(rows), "errors": report})
 
 # ---------- Bulk approval ----------
 @app.route("/records/bulk_approval", methods=["POST"])
@@ -766,24 +1895,85 @@ def bulk_approval():
         ids = data.get("ids", [])
         status = str(data.get("status","")).strip()
     except:
-        return jsonify({"ok": False, "error": "Invalid JSON payload"}), 400
-    valid_status = {"Pending","Approved","Not Approved"}
+        return json_response({"ok": False, "error": "Invalid JSON payload"}, 400)
+    valid_status = set(APPROVAL_STATUSES)
     if status not in valid_status:
-        return jsonify({"ok": False, "error": "Invalid status value"}), 400
+        return json_response({"ok": False, "error": "Invalid status value"}, 400)
     if not ids:
-        return jsonify({"ok": False, "error": "No record IDs provided"}), 400
-    rows = Adjustment.query.filter(Adjustment.id.in_(ids)).all()
-    if not rows:
-        return jsonify({"ok": False, "error": "No matching records"}), 404
+        return json_response({"ok": False, "error": "No record IDs provided"}, 400)
     try:
-        for r in rows:
-            r.Approval = status
-            r.DateUpdated = datetime.utcnow()
+        now = datetime.utcnow()
+        # history first (captures the old values), then one UPDATE for every row
+        changed = db.select(
+            Adjustment.id, db.literal(now), db.literal(user), db.literal("approval"),
+            db.literal("Approval"), db.func.coalesce(Adjustment.Approval, ""), db.literal(status)
+        ).where(Adjustment.id.in_(ids), Adjustment.Approval.is_distinct_from(status))
+        db.session.execute(db.insert(AdjustmentHistory).from_select(
+            ["AdjustmentId", "ChangedAt", "ChangedBy", "Action", "Field", "OldValue", "NewValue"], changed
+        ))
+        updated = db.session.query(Adjustment).filter(Adjustment.id.in_(ids)).update(
+            {Adjustment.Approval: status, Adjustment.DateUpdated: now}, synchronize_session=False
+        )
+        # archived rows are read-only: report them instead of silently dropping them
+        archived = db.session.query(db.func.count(ArchivedAdjustment.id)).filter(ArchivedAdjustment.id.in_(ids)).scalar()
+        if not updated:
+            db.session.rollback()
+            if archived:
+                return json_response({"ok": False, "error": "Archived records are read-only"}, 409)
+            return json_response({"ok": False, "error": "No matching records"}, 404)
+        bump_data_version()
         db.session.commit()
-        return jsonify({"ok": True, "updated": len(rows)})
+        return json_response({"ok": True, "updated": updated, "skipped_archived": archived})
     except Exception as e:
         db.session.rollback()
-        return jsonify({"ok": False, "error": "DB error: " + str(e)}), 500
+        return json_response({"ok": False, "error": "DB error: " + str(e)}, 500)
+
+# ---------- History API ----------
+HISTORY_PAGE = 200
+
+@app.route("/api/history/<id>")
+def api_record_history(id):
+    if not require_login():
+        return abort(401)
+    _, role, center = current_user()
+    if role != "admin":
+        # same centre rule as edit / delete, for live or archived records;
+        # history of deleted records is admin-only
+        found = (
+            db.session.query(Adjustment.enrollment_id).filter(Adjustment.id == str(id)).first()
+            or db.session.query(ArchivedAdjustment.enrollment_id).filter(ArchivedAdjustment.id == str(id)).first()
+        )
+        if not found:
+            return abort(404)
+        enr = db.session.get(Enrollment, found[0]) if found[0] is not None else None
+        if not enr or (enr.Centre or "").strip().lower() != str(center).strip().lower():
+            return abort(403)
+    rows = (
+        AdjustmentHistory.query.filter(AdjustmentHistory.AdjustmentId == str(id))
+        .order_by(AdjustmentHistory.ChangedAt, AdjustmentHistory.id).all()
+    )
+    return json_response({"ok": True, "history": [history_to_dict(h) for h in rows]})
+
+@app.route("/api/history")
+def api_history_by_user():
+    if not require_login():
+        return abort(401)
+    _, role, _ = current_user()
+    if role != "admin":
+        return abort(403)
+    who = (request.args.get("user") or "").strip()
+    if not who:
+        return json_response({"ok": False, "error": "user is required"}, 400)
+    start = parse_date_safe(request.args.get("from"))
+    end = parse_date_safe(request.args.get("to"))
+    query = AdjustmentHistory.query.filter(AdjustmentHistory.ChangedBy == who)
+    if start:
+        query = query.filter(AdjustmentHistory.ChangedAt >= ensure_datetime_from_date_or_dt(start))
+    if end:
+        # "to" is inclusive of the whole day
+        query = query.filter(AdjustmentHistory.ChangedAt < ensure_datetime_from_date_or_dt(end) + timedelta(days=1))
+    rows = query.order_by(AdjustmentHistory.ChangedAt.desc(), AdjustmentHistory.id.desc()).limit(HISTORY_PAGE).all()
+    return json_response({"ok": True, "history": [history_to_dict(h) for h in rows]})
 
 # ---------- Export ----------
 @app.route("/export")
@@ -792,7 +1982,7 @@ def export_excel():
         return abort(401)
     user, role, center = current_user()
     req_center = (request.args.get("center") or "").strip()
-    df = load_adjustments_df()
+    df = load_adjustments_df(include_archived=arg_flag("include_archived"))
     if "Centre" not in df.columns:
         df["Centre"] = ""
     df["Centre"] = df["Centre"].astype(str).str.strip()
@@ -814,13 +2004,140 @@ def export_excel():
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
 
-# ---------- Debug route ----------
-@app.route("/debug_adjustments")
-def debug_adjustments():
+# ---------- Request profiling ----------
+# Admins can profile any request with ?__profile=1 or an "X-Profile: 1" header;
+# PROFILE_SAMPLE_RATE (0..1) additionally profiles a random share of all requests.
+# Streamed responses are saved once the body has been sent, so they carry no X-Profile-Id.
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_KEEP = 500          # most recent profiles kept in request_profiles
+PROFILE_TOP_FUNCTIONS = 40  # rows of the cProfile summary stored per request
+PROFILE_SQL_LIMIT = 200     # statements stored per request (count and time cover all of them)
+
+def should_profile():
+    if request.path.startswith(("/debug/profiles", "/Static/", "/static/")):
+        return False
+    if (session.get("role") or "").strip().lower() == "admin":
+        if arg_flag("__profile") or request.headers.get("X-Profile") == "1":
+            return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+@app.before_request
+def start_request_profile():
+    if not should_profile():
+        return
+    g.profile_sql = []
+    g.profile_sql_totals = [0, 0.0]   # every statement, including ones past PROFILE_SQL_LIMIT
+    g.profile_started = perf_counter()
+    g.profiler = cProfile.Profile()
+    try:
+        g.profiler.enable()
+    except ValueError:
+        # another profiler already active in this process; keep SQL timings only
+        g.profiler = None
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _profile_sql_start(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and g.get("profile_sql") is not None:
+        conn.info.setdefault("profile_query_start", []).append(perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _profile_sql_end(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("profile_query_start")
+    if not started:
+        return
+    elapsed = (perf_counter() - started.pop()) * 1000
+    sql_log = g.get("profile_sql") if has_request_context() else None
+    if sql_log is None:
+        return
+    g.profile_sql_totals[0] += 1
+    g.profile_sql_totals[1] += elapsed
+    if len(sql_log) < PROFILE_SQL_LIMIT:
+        sql_log.append({"sql": statement, "ms": round(elapsed, 3)})
+
+def save_request_profile(meta, sql_log, sql_totals, profiler, started):
+    """Store one profile in request_profiles (own connection); returns its id, or None."""
+    duration = (perf_counter() - started) * 1000
+    summary = ""
+    if profiler is not None:
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        summary = out.getvalue()
+    row = dict(
+        meta,
+        CreatedAt=datetime.utcnow(),
+        DurationMs=round(duration, 2),
+        SqlCount=sql_totals[0],
+        SqlMs=round(sql_totals[1], 2),
+        Statements=json.dumps(sql_log),
+        Profile=summary,
+    )
+    try:
+        # own connection, so a failed request session can't lose or block the profile
+        with db.engine.begin() as conn:
+            new_id = conn.execute(db.insert(RequestProfile).returning(RequestProfile.id), row).scalar()
+            conn.execute(db.delete(RequestProfile).where(RequestProfile.id <= new_id - PROFILE_KEEP))
+        return new_id
+    except Exception as e:
+        print("Profile save failed:", e)
+        return None
+
+@app.after_request
+def finish_request_profile(response):
+    if g.get("profile_sql") is None:
+        return response
+    meta = {
+        "Method": request.method,
+        "Path": request.full_path.rstrip("?")[:500],
+        "User": session.get("user"),
+        "Status": response.status_code,
+    }
+    args = (meta, g.profile_sql, g.profile_sql_totals, g.profiler, g.profile_started)
+    if response.is_streamed:
+        # the body (and the SQL behind it) is produced after this hook; keep collecting
+        # through the stream and save once the server closes the response
+        def finish_streamed():
+            with app.app_context():
+                save_request_profile(*args)
+        response.call_on_close(finish_streamed)
+        return response
+    g.profile_sql = None
+    new_id = save_request_profile(*args)
+    if new_id is not None:
+        response.headers["X-Profile-Id"] = str(new_id)
+    return response
+
+@app.route("/debug/profiles")
+@app.route("/debug/profiles/<int:profile_id>")
+def debug_profiles(profile_id=None):
     if not require_login():
         return abort(401)
-    df = load_adjustments_df()
-    return df.to_html(index=False)
+    _, role, _ = current_user()
+    if role != "admin":
+        return abort(403)
+    try:
+        hours = max(1, int(request.args.get("hours", 24)))
+    except ValueError:
+        hours = 24
+    since = datetime.utcnow() - timedelta(hours=hours)
+    slowest = (
+        db.session.query(
+            RequestProfile.id, RequestProfile.CreatedAt, RequestProfile.Method, RequestProfile.Path,
+            RequestProfile.User, RequestProfile.Status, RequestProfile.DurationMs,
+            RequestProfile.SqlCount, RequestProfile.SqlMs
+        )
+        .filter(RequestProfile.CreatedAt >= since)
+        .order_by(RequestProfile.DurationMs.desc()).limit(50).all()
+    )
+    selected, statements = None, []
+    if profile_id is not None:
+        selected = db.session.get(RequestProfile, profile_id)
+        if not selected:
+            return abort(404)
+        statements = json.loads(selected.Statements or "[]")
+    return render_template(
+        "profiles.html", profiles=slowest, hours=hours, selected=selected, statements=statements
+    )
 
 # ---------- Static files ----------
 @app.route("/Static/<path:filename>")
@@ -832,6 +2149,7 @@ if __name__ == "__main__":
     ensure_data_dir()
     with app.app_context():
         db.create_all()
+        apply_schema_upgrades()
         import_csv_to_db_if_empty()
 
     # Only use debug mode after DB setup
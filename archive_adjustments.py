@@ -0,0 +1,23 @@
+# archive_adjustments.py — move adjustments from closed billing periods out of the live table
+# usage: python archive_adjustments.py [--before YYYY-MM-DD] [--dry-run]
+import sys
+from app import app, db, parse_date_safe, archive_cutoff, archive_closed_periods
+
+def main():
+    args = sys.argv[1:]
+    cutoff = None
+    if "--before" in args:
+        i = args.index("--before")
+        cutoff = parse_date_safe(args[i + 1] if i + 1 < len(args) else "")
+        if not cutoff:
+            print("Invalid --before date, use YYYY-MM-DD")
+            sys.exit(1)
+    cutoff = cutoff or archive_cutoff()
+    dry_run = "--dry-run" in args
+    with app.app_context():
+        db.create_all()
+        n = archive_closed_periods(cutoff, dry_run=dry_run)
+    print(("Would archive" if dry_run else "Archived"), n, "adjustments ending before", cutoff.isoformat())
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
-from app import app, db
+from app import app, db, apply_schema_upgrades
 
 with app.app_context():
     db.create_all()
+    apply_schema_upgrades()
     print("Database tables created successfully!")
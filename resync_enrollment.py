@@ -0,0 +1,21 @@
+# resync_enrollment.py — apply roster changes from a CSV without reloading the table
+# usage: python resync_enrollment.py [path/to/ChildEnrollment.csv] [--dry-run] [--deactivate-missing]
+import sys
+from app import app, ENROLL_FILE, resync_enrollment_from_csv
+
+def main():
+    args = sys.argv[1:]
+    paths = [a for a in args if not a.startswith("--")]
+    source = paths[0] if paths else ENROLL_FILE
+    with app.app_context():
+        summary = resync_enrollment_from_csv(
+            source,
+            dry_run="--dry-run" in args,
+            deactivate_missing="--deactivate-missing" in args
+        )
+    print("Enrollment re-sync from", source)
+    for k, v in summary.items():
+        print(f"  {k}: {v}")
+
+if __name__ == "__main__":
+    main()
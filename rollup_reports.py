@@ -0,0 +1,9 @@
+# rollup_reports.py — rebuild the monthly reporting rollup for closed months
+# run once a month, and again after approving or correcting items in closed months:
+#   python rollup_reports.py
+from app import app, db, AdjustmentRollup, refresh_report_rollup
+
+with app.app_context():
+    db.create_all()
+    refresh_report_rollup()
+    print("Monthly rollup rebuilt:", AdjustmentRollup.query.count(), "rows.")
@@ -0,0 +1,9 @@
+# tests/conftest.py — make app.py importable and keep tests off real databases / caches
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# importing app never connects, but keep it off the production database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("FRAGMENT_CACHE_DIR", "")
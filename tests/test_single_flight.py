@@ -0,0 +1,98 @@
+# tests/test_single_flight.py — request coalescing for roster lookups
+# run: python -m pytest -q
+import threading
+import time
+
+import pytest
+
+import app as portal
+from app import SingleFlight
+
+USERS = 50
+
+def run_concurrently(flight, key, loader, users=USERS):
+    """Start `users` threads on flight.do(key, loader) together; return (threads, results, errors)."""
+    barrier = threading.Barrier(users)
+    results, errors = [], []
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(flight.do(key, loader))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(users)]
+    for t in threads:
+        t.start()
+    return threads, results, errors
+
+def gated_loader(value=None, error=None):
+    """Loader that blocks until released, counting how often it runs."""
+    calls, release = [], threading.Event()
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        if error is not None:
+            raise error
+        return value
+    return loader, calls, release
+
+def finish(threads, release):
+    time.sleep(0.2)  # let every thread reach do() while the first load is in flight
+    release.set()
+    for t in threads:
+        t.join(5)
+
+@pytest.mark.parametrize("users", [1, 10, USERS])
+def test_concurrent_callers_share_one_load(users):
+    flight = SingleFlight(ttl=30)
+    roster = {"children": ["a"], "families": ["b"]}
+    loader, calls, release = gated_loader(value=roster)
+
+    threads, results, errors = run_concurrently(flight, ("children", "centre"), loader, users)
+    finish(threads, release)
+
+    assert errors == []
+    assert len(calls) == 1  # query count stays flat however many users arrive
+    assert len(results) == users
+    assert all(r is roster for r in results)
+
+def test_loader_error_reaches_every_waiter():
+    flight = SingleFlight(ttl=30)
+    boom = RuntimeError("roster unavailable")
+    loader, calls, release = gated_loader(error=boom)
+
+    threads, results, errors = run_concurrently(flight, ("details", "centre"), loader)
+    finish(threads, release)
+
+    assert len(calls) == 1
+    assert results == []
+    assert len(errors) == USERS and all(e is boom for e in errors)
+    # failures are not cached: the next call loads again
+    assert flight.do(("details", "centre"), lambda: "ok") == "ok"
+
+def test_result_expires_after_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(portal, "monotonic", lambda: clock[0])
+    flight = SingleFlight(ttl=30)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("centres", loader) == 1
+    clock[0] += 29
+    assert flight.do("centres", loader) == 1
+    clock[0] += 2
+    assert flight.do("centres", loader) == 2
+    assert len(calls) == 2
+
+def test_cache_never_exceeds_max_entries():
+    flight = SingleFlight(ttl=30, max_entries=8)
+    for i in range(100):
+        flight.do(("details", f"centre {i}"), lambda i=i: i)
+    assert len(flight._results) == 8
+    assert flight.do(("details", "centre 99"), lambda: "reloaded") == 99